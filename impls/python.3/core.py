@@ -1,47 +1,69 @@
-from dataclasses import dataclass
 from parser import parse_str
 from typing import MutableMapping, TypeVar
 
-from mal_types import (Atom, Expression, ExpressionT, FalseV, Function,
-                       FunctionDefinition, List, MalException, Nil, Number,
-                       Pretty, String, TrueV, Vector)
+from mal_types import (FALSE, NIL, PRETTY_PLAIN, PRETTY_READABLE, TRUE, Atom,
+                       Expression, ExpressionT, FalseV, Function,
+                       FunctionDefinition, HashMap, List, ListTail,
+                       MalException, Nil, Number, String, TrueV, Vector)
 
 T = TypeVar("T", bound=Expression)
 
 
-@dataclass
 class UnexpectedArgument(MalException):
+    __slots__ = ("argument", "msg")
+
     argument: ExpressionT
     msg: str
 
+    def __init__(self, argument: ExpressionT, msg: str) -> None:
+        super().__init__(argument, msg)
+        self.argument = argument
+        self.msg = msg
+
     def __str__(self):
-        p = Pretty()
+        p = PRETTY_READABLE
         return (
-            f"Error! Unexpected argument {self.argument.visit(p)}, expected " + self.msg
+            f"Error! Unexpected argument {p.visit(self.argument)}, expected " + self.msg
         )
 
 
-@dataclass
 class UnexpectedNumberOfArguments(MalException):
+    __slots__ = ("name", "expected")
+
     name: str
     expected: int
 
+    def __init__(self, name: str, expected: int) -> None:
+        super().__init__(name, expected)
+        self.name = name
+        self.expected = expected
+
     def __str__(self):
         return f"Error! bad number of arguments at {self.name} expected {self.expected}"
 
 
-@dataclass
 class ParsingError(MalException):
+    __slots__ = ("msg",)
+
     msg: str
 
+    def __init__(self, msg: str) -> None:
+        super().__init__(msg)
+        self.msg = msg
+
     def __str__(self):
         return self.msg
 
 
-@dataclass
 class MalIOError(MalException):
+    __slots__ = ("e",)
+
     e: IOError
 
+    def __init__(self, e: IOError) -> None:
+        super().__init__(e)
+        self.e = e
+
 
 class CarOnEmptyList(MalException):
     def __str__(self):
@@ -54,7 +76,7 @@ class CdrOnEmptyList(MalException):
 
 
 def assert_is_of_class(x: ExpressionT, _class: type[T]) -> T:
-    if not isinstance(x, _class):
+    if type(x) is not _class:
         raise UnexpectedArgument(x, " a " + _class.__name__)
     return x
 
@@ -68,7 +90,8 @@ def assert_list(x: ExpressionT) -> List:
 
 
 def assert_sequence(x: ExpressionT) -> List | Vector:
-    if isinstance(x, List) or isinstance(x, Vector):
+    t = type(x)
+    if t is List or t is Vector:
         return x
     raise UnexpectedArgument(x, " a sequence")
 
@@ -88,12 +111,12 @@ def assert_argument_number(x: list[ExpressionT], n: int, name: str) -> None:
 
 
 def bool_to_mal_bool(x: bool):
-    return TrueV() if x else FalseV()
+    return TRUE if x else FALSE
 
 
 def prn(args: list[ExpressionT]) -> Nil:
     print(pr_str(args).value)
-    return Nil()
+    return NIL
 
 
 def _list(args: list[ExpressionT]) -> List:
@@ -101,90 +124,181 @@ def _list(args: list[ExpressionT]) -> List:
 
 
 def is_list(args: list[ExpressionT]) -> TrueV | FalseV:
-    assert_argument_number(args, 1, "list?")
-    return bool_to_mal_bool(isinstance(args[0], List))
+    if len(args) != 1:
+        raise UnexpectedNumberOfArguments("list?", 1)
+    return bool_to_mal_bool(type(args[0]) is List)
 
 
 def is_empty(args: list[ExpressionT]) -> TrueV | FalseV:
-    assert_argument_number(args, 1, "empty?")
+    if len(args) != 1:
+        raise UnexpectedNumberOfArguments("empty?", 1)
     ls = assert_sequence(args[0])
     return bool_to_mal_bool(not bool(ls.value))
 
 
 def count(args: list[ExpressionT]) -> Number:
-    assert_argument_number(args, 1, "count")
-    if isinstance(args[0], Nil):
+    if len(args) != 1:
+        raise UnexpectedNumberOfArguments("count", 1)
+    if args[0] is NIL:
         return Number(0)
     ls = assert_sequence(args[0])
     return Number(len(ls.value))
 
 
+def _eq(x: ExpressionT, y: ExpressionT) -> bool:
+    # Iterative to avoid a Python frame (and an argument list) per
+    # nested element
+    stack = [(x, y)]
+    while stack:
+        x, y = stack.pop()
+        if x is y:
+            continue
+        # TODO: WHY??? WHY???Y WHY have vectors if
+        # mal doesn't make a distintion between vectors and list?
+        tx = type(x)
+        ty = type(y)
+        if (tx is List or tx is Vector) and (ty is List or ty is Vector):
+            if len(x.value) != len(y.value):
+                return False
+            stack.extend(zip(x.value, y.value))
+            continue
+        if tx is HashMap and ty is HashMap:
+            if x.value.keys() != y.value.keys():
+                return False
+            stack.extend((v, y.value[k]) for k, v in x.value.items())
+            continue
+        if tx is not ty or x != y:
+            return False
+    return True
+
+
 def eq(args: list[ExpressionT]) -> TrueV | FalseV:
-    assert_argument_number(args, 2, "(=)")
-    x = args[0]
-    y = args[1]
-    # TODO: WHY??? WHY???Y WHY have vectors if
-    # mal doesn't make a distintion between vectors and list?
-    if isinstance(x, List) or isinstance(x, Vector):
-        if isinstance(y, List) or isinstance(y, Vector):
-            return bool_to_mal_bool(
-                len(x.value) == len(y.value)
-                and all(eq([x1, y1]) for x1, y1 in zip(x.value, y.value))
-            )
-    if not isinstance(args[0], type(args[1])):
-        return FalseV()
-    if args[0] == args[1]:
-        return TrueV()
-    return FalseV()
+    if len(args) != 2:
+        raise UnexpectedNumberOfArguments("(=)", 2)
+    return TRUE if _eq(args[0], args[1]) else FALSE
+
+
+def _not_a_number(a: ExpressionT, b: ExpressionT) -> UnexpectedArgument:
+    return UnexpectedArgument(b if type(a) is Number else a, " a Number")
+
+
+# Numbers are never mutated, so like CPython we share the small ones
+# instead of allocating a new node for each result
+_SMALL_NUMBERS = {i: Number(i) for i in range(-5, 257)}
+
+
+# The arithmetic primitives check the types inline, they are
+# the hottest functions of the namespace.
+def add(t: list[ExpressionT]) -> Number:
+    a = t[0]
+    b = t[1]
+    if type(a) is not Number or type(b) is not Number:
+        raise _not_a_number(a, b)
+    r = a.value + b.value
+    n = _SMALL_NUMBERS.get(r)
+    return Number(r) if n is None else n
+
+
+def sub(t: list[ExpressionT]) -> Number:
+    a = t[0]
+    b = t[1]
+    if type(a) is not Number or type(b) is not Number:
+        raise _not_a_number(a, b)
+    r = a.value - b.value
+    n = _SMALL_NUMBERS.get(r)
+    return Number(r) if n is None else n
+
+
+def div(t: list[ExpressionT]) -> Number:
+    a = t[0]
+    b = t[1]
+    if type(a) is not Number or type(b) is not Number:
+        raise _not_a_number(a, b)
+    r = a.value // b.value
+    n = _SMALL_NUMBERS.get(r)
+    return Number(r) if n is None else n
+
+
+def mul(t: list[ExpressionT]) -> Number:
+    a = t[0]
+    b = t[1]
+    if type(a) is not Number or type(b) is not Number:
+        raise _not_a_number(a, b)
+    r = a.value * b.value
+    n = _SMALL_NUMBERS.get(r)
+    return Number(r) if n is None else n
+
+
+def mod(t: list[ExpressionT]) -> Number:
+    a = t[0]
+    b = t[1]
+    if type(a) is not Number or type(b) is not Number:
+        raise _not_a_number(a, b)
+    r = a.value % b.value
+    n = _SMALL_NUMBERS.get(r)
+    return Number(r) if n is None else n
 
 
 def le(args: list[ExpressionT]) -> TrueV | FalseV:
-    assert_argument_number(args, 2, "(<)")
-    a = assert_number(args[0])
-    b = assert_number(args[1])
-    return bool_to_mal_bool(a.value < b.value)
+    if len(args) != 2:
+        raise UnexpectedNumberOfArguments("(<)", 2)
+    a = args[0]
+    b = args[1]
+    if type(a) is not Number or type(b) is not Number:
+        raise _not_a_number(a, b)
+    return TRUE if a.value < b.value else FALSE
 
 
 def leq(args: list[ExpressionT]) -> TrueV | FalseV:
-    assert_argument_number(args, 2, "(<=)")
-    a = assert_number(args[0])
-    b = assert_number(args[1])
-    return bool_to_mal_bool(a.value <= b.value)
+    if len(args) != 2:
+        raise UnexpectedNumberOfArguments("(<=)", 2)
+    a = args[0]
+    b = args[1]
+    if type(a) is not Number or type(b) is not Number:
+        raise _not_a_number(a, b)
+    return TRUE if a.value <= b.value else FALSE
 
 
 def gt(args: list[ExpressionT]) -> TrueV | FalseV:
-    assert_argument_number(args, 2, "(>)")
-    a = assert_number(args[0])
-    b = assert_number(args[1])
-    return bool_to_mal_bool(a.value > b.value)
+    if len(args) != 2:
+        raise UnexpectedNumberOfArguments("(>)", 2)
+    a = args[0]
+    b = args[1]
+    if type(a) is not Number or type(b) is not Number:
+        raise _not_a_number(a, b)
+    return TRUE if a.value > b.value else FALSE
 
 
 def geq(args: list[ExpressionT]) -> TrueV | FalseV:
-    assert_argument_number(args, 2, "(>=)")
-    a = assert_number(args[0])
-    b = assert_number(args[1])
-    return bool_to_mal_bool(a.value >= b.value)
+    if len(args) != 2:
+        raise UnexpectedNumberOfArguments("(>=)", 2)
+    a = args[0]
+    b = args[1]
+    if type(a) is not Number or type(b) is not Number:
+        raise _not_a_number(a, b)
+    return TRUE if a.value >= b.value else FALSE
 
 
 def pr_str(args: list[ExpressionT]) -> String:
-    p = Pretty()
-    return String(" ".join(x.visit(p) for x in args))
+    p = PRETTY_READABLE
+    return String(" ".join([p.visit(x) for x in args]))
 
 
 def mal_str(args: list[ExpressionT]) -> String:
-    p = Pretty(False)
-    return String("".join(x.visit(p) for x in args))
+    p = PRETTY_PLAIN
+    return String("".join([p.visit(x) for x in args]))
 
 
 def println(args: list[ExpressionT]) -> Nil:
-    p = Pretty(False)
-    result = " ".join(x.visit(p) for x in args)
+    p = PRETTY_PLAIN
+    result = " ".join([p.visit(x) for x in args])
     print(result)
-    return Nil()
+    return NIL
 
 
 def car(x: list[ExpressionT]) -> ExpressionT:
-    assert_argument_number(x, 1, "car")
+    if len(x) != 1:
+        raise UnexpectedNumberOfArguments("car", 1)
     ls = assert_list(x[0])
     if ls.value:
         return ls.value[0]
@@ -192,15 +306,17 @@ def car(x: list[ExpressionT]) -> ExpressionT:
 
 
 def cdr(x: list[ExpressionT]) -> ExpressionT:
-    assert_argument_number(x, 1, "cdr")
+    if len(x) != 1:
+        raise UnexpectedNumberOfArguments("cdr", 1)
     ls = assert_list(x[0])
     if len(ls.value) >= 1:
-        return List(ls.value[1:])
+        return List(ListTail(ls.value, 1))
     raise CdrOnEmptyList()
 
 
 def read_string(x: list[ExpressionT]) -> ExpressionT:
-    assert_argument_number(x, 1, "read-string")
+    if len(x) != 1:
+        raise UnexpectedNumberOfArguments("read-string", 1)
     s = assert_string(x[0])
     result = parse_str(s.value)
     if isinstance(result, str):
@@ -209,7 +325,8 @@ def read_string(x: list[ExpressionT]) -> ExpressionT:
 
 
 def slurp(x: list[ExpressionT]) -> String:
-    assert_argument_number(x, 1, "slurp")
+    if len(x) != 1:
+        raise UnexpectedNumberOfArguments("slurp", 1)
     s = assert_string(x[0])
     try:
         with open(s.value, "r") as f:
@@ -220,23 +337,27 @@ def slurp(x: list[ExpressionT]) -> String:
 
 
 def atom(x: list[ExpressionT]) -> ExpressionT:
-    assert_argument_number(x, 1, "atom")
+    if len(x) != 1:
+        raise UnexpectedNumberOfArguments("atom", 1)
     return Atom(x[0])
 
 
 def is_atom(x: list[ExpressionT]) -> ExpressionT:
-    assert_argument_number(x, 1, "atom")
-    return bool_to_mal_bool(isinstance(x[0], Atom))
+    if len(x) != 1:
+        raise UnexpectedNumberOfArguments("atom", 1)
+    return bool_to_mal_bool(type(x[0]) is Atom)
 
 
 def deref(x: list[ExpressionT]) -> ExpressionT:
-    assert_argument_number(x, 1, "deref")
+    if len(x) != 1:
+        raise UnexpectedNumberOfArguments("deref", 1)
     a = assert_atom(x[0])
     return a.value
 
 
 def reset(x: list[ExpressionT]) -> ExpressionT:
-    assert_argument_number(x, 2, "reset")
+    if len(x) != 2:
+        raise UnexpectedNumberOfArguments("reset", 2)
     a = assert_atom(x[0])
     v = x[1]
     a.value = v
@@ -248,55 +369,47 @@ def swap(x: list[ExpressionT]) -> ExpressionT:
         # TODO: replace this with a more acurate exception
         raise UnexpectedNumberOfArguments("swap", 2)
     a = assert_atom(x[0])
-    args = x[2:]
     f = x[1]
 
-    if isinstance(f, Function):
-        a.value = f.value([a.value] + args)
-        return a.value
-    if isinstance(f, FunctionDefinition):
-        a.value = f.closure.value([a.value] + args)
+    t = type(f)
+    if t is Function or t is FunctionDefinition:
+        a.value = f([a.value, *x[2:]] if len(x) > 2 else [a.value])
         return a.value
     raise UnexpectedArgument(x[1], "a function")
 
 
+_NAMESPACE: dict[str, ExpressionT] = {
+    "+": Function(add),
+    "-": Function(sub),
+    "/": Function(div),
+    "*": Function(mul),
+    "%": Function(mod),
+    "prn": Function(prn),
+    "list": Function(_list),
+    "list?": Function(is_list),
+    "empty?": Function(is_empty),
+    "count": Function(count),
+    "=": Function(eq),
+    "<": Function(le),
+    "<=": Function(leq),
+    ">": Function(gt),
+    ">=": Function(geq),
+    "pr-str": Function(pr_str),
+    "str": Function(mal_str),
+    "println": Function(println),
+    "car": Function(car),
+    "cdr": Function(cdr),
+    "read-string": Function(read_string),
+    "slurp": Function(slurp),
+    "atom": Function(atom),
+    "atom?": Function(is_atom),
+    "deref": Function(deref),
+    "reset!": Function(reset),
+    "swap!": Function(swap),
+}
+
+
 def get_namespace() -> MutableMapping[str, ExpressionT]:
-    return {
-        "+": Function(
-            lambda t: Number(assert_number(t[0]).value + assert_number(t[1]).value)
-        ),
-        "-": Function(
-            lambda t: Number(assert_number(t[0]).value - assert_number(t[1]).value)
-        ),
-        "/": Function(
-            lambda t: Number(assert_number(t[0]).value // assert_number(t[1]).value)
-        ),
-        "*": Function(
-            lambda t: Number(assert_number(t[0]).value * assert_number(t[1]).value)
-        ),
-        "%": Function(
-            lambda t: Number(assert_number(t[0]).value % assert_number(t[1]).value)
-        ),
-        "prn": Function(prn),
-        "list": Function(_list),
-        "list?": Function(is_list),
-        "empty?": Function(is_empty),
-        "count": Function(count),
-        "=": Function(eq),
-        "<": Function(le),
-        "<=": Function(leq),
-        ">": Function(gt),
-        ">=": Function(geq),
-        "pr-str": Function(pr_str),
-        "str": Function(mal_str),
-        "println": Function(println),
-        "car": Function(car),
-        "cdr": Function(cdr),
-        "read-string": Function(read_string),
-        "slurp": Function(slurp),
-        "atom": Function(atom),
-        "atom?": Function(is_atom),
-        "deref": Function(deref),
-        "reset!": Function(reset),
-        "swap!": Function(swap),
-    }
+    # The environments mutate the dict through def!, so every caller
+    # gets its own copy of the shared table
+    return _NAMESPACE.copy()
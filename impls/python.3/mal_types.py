@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Callable, Generic, MutableMapping, Optional, TypeVar, Union
+import sys
+from dataclasses import dataclass, field
+from typing import (Any, Callable, ClassVar, Generic, Iterator, MutableMapping,
+                    Optional, Sequence, TypeVar, Union, overload)
 
 T = TypeVar("T")
 
@@ -24,199 +25,403 @@ ExpressionT = Union[
 
 
 class MalException(Exception):
-    pass
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
 
 
-@dataclass
 class NonFunctionFormAtFirstListITem(MalException):
+    __slots__ = ("exp", "f", "arguments")
+
     exp: ExpressionT
     f: ExpressionT
     arguments: list[ExpressionT]
 
+    def __init__(
+        self,
+        exp: ExpressionT,
+        f: ExpressionT,
+        arguments: list[ExpressionT],
+    ) -> None:
+        super().__init__(exp, f, arguments)
+        self.exp = exp
+        self.f = f
+        self.arguments = arguments
+
     def __str__(self):
-        p = Pretty()
+        p = PRETTY_READABLE
         return (
             "Error! expected a function or form as first argument, got:\n"
-            + self.f.visit(p)
+            + p.visit(self.f)
             + "\nIn let expression: \n"
-            + List(self.arguments).visit(p)
+            + p.visit(List(self.arguments))
         )
 
 
-class Visitor(ABC, Generic[T]):
-    @abstractmethod
+class Visitor(Generic[T]):
+    # Maps the type of an expression straight to the method that handles
+    # it, so visiting a node costs a single dict lookup and call
+    _dispatch: ClassVar[dict[type, Callable[[Any, Any], Any]]]
+
+    def __init_subclass__(cls, abstract: bool = False, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        # Fail when the class is defined instead of the first time a node
+        # without a handler shows up, pass `abstract=True` to skip this
+        if not abstract:
+            missing = [
+                name
+                for name, method in vars(Visitor).items()
+                if name.startswith("visit_") and getattr(cls, name) is method
+            ]
+            if missing:
+                raise TypeError(
+                    f"{cls.__name__} does not implement: {', '.join(missing)}"
+                )
+        cls._dispatch = {
+            Symbol: cls.visit_symbol,
+            Keyword: cls.visit_keyword,
+            Number: cls.visit_number,
+            TrueV: cls.visit_true,
+            FalseV: cls.visit_false,
+            Nil: cls.visit_nil,
+            String: cls.visit_string,
+            List: cls.visit_list,
+            Vector: cls.visit_vector,
+            HashMap: cls.visit_hash_map,
+            Function: cls.visit_function,
+            FunctionDefinition: cls.visit_function_definition,
+            Atom: cls.visit_atom,
+        }
+
+    def visit(self, exp: ExpressionT) -> T:
+        return self._dispatch[type(exp)](self, exp)
+
     def visit_symbol(self, s: Symbol) -> T:
-        pass
+        """Handles a `Symbol` node."""
 
-    @abstractmethod
     def visit_keyword(self, s: Keyword) -> T:
-        pass
+        """Handles a `Keyword` node."""
 
-    @abstractmethod
     def visit_number(self, n: Number) -> T:
-        pass
+        """Handles a `Number` node."""
 
-    @abstractmethod
     def visit_true(self, t: TrueV) -> T:
-        pass
+        """Handles a `TrueV` node."""
 
-    @abstractmethod
     def visit_false(self, f: FalseV) -> T:
-        pass
+        """Handles a `FalseV` node."""
 
-    @abstractmethod
     def visit_nil(self, n: Nil) -> T:
-        pass
+        """Handles a `Nil` node."""
 
-    @abstractmethod
     def visit_string(self, st: String) -> T:
-        pass
+        """Handles a `String` node."""
 
-    @abstractmethod
     def visit_list(self, ls: List) -> T:
-        pass
+        """Handles a `List` node."""
 
-    @abstractmethod
     def visit_vector(self, v: Vector) -> T:
-        pass
+        """Handles a `Vector` node."""
 
-    @abstractmethod
     def visit_hash_map(self, v: HashMap) -> T:
-        pass
+        """Handles a `HashMap` node."""
 
-    @abstractmethod
     def visit_function(self, v: Function) -> T:
-        pass
+        """Handles a `Function` node."""
 
-    @abstractmethod
     def visit_function_definition(self, v: FunctionDefinition) -> T:
-        pass
+        """Handles a `FunctionDefinition` node."""
 
-    @abstractmethod
     def visit_atom(self, v: Atom) -> T:
-        pass
+        """Handles an `Atom` node."""
 
 
-class Expression(ABC):
-    @abstractmethod
-    def visit(self, visitor: Visitor[T]) -> T:
-        pass
+class Expression:
+    __slots__ = ()
 
 
-@dataclass
 class Symbol(Expression):
+    __slots__ = ("symbol",)
+    __match_args__ = ("symbol",)
+
     symbol: str
+    # Every distinct name gets a single Symbol instance, whose name is an
+    # interned string, so the environments are always keyed by interned
+    # strings no matter where the Symbol was built
+    _cache: ClassVar[dict[str, Symbol]] = {}
+
+    def __new__(cls, symbol: str):
+        cached = cls._cache.get(symbol)
+        if cached is None:
+            cached = object.__new__(cls)
+            symbol = sys.intern(symbol)
+            cached.symbol = symbol
+            cls._cache[symbol] = cached
+        return cached
+
+    def __init__(self, symbol: str) -> None:
+        # Already initialized by __new__
+        pass
+
+    def __repr__(self) -> str:
+        return f"Symbol(symbol={self.symbol!r})"
+
+    def __eq__(self, other: object) -> bool:
+        return type(other) is Symbol and self.symbol == other.symbol
 
-    def visit(self, visitor: Visitor[T]) -> T:
-        return visitor.visit_symbol(self)
+    __hash__ = None  # type: ignore[assignment]
 
 
-@dataclass
 class Keyword(Expression):
+    __slots__ = ("value", "_hash")
+    __match_args__ = ("value",)
+
     value: str
+    _hash: int
+
+    def __init__(self, value: str) -> None:
+        self.value = value
+        self._hash = hash(value)
+
+    def __repr__(self) -> str:
+        return f"Keyword(value={self.value!r})"
 
-    def visit(self, visitor: Visitor[T]) -> T:
-        return visitor.visit_keyword(self)
+    def __eq__(self, other: object) -> bool:
+        return type(other) is Keyword and self.value == other.value
 
     def __hash__(self):
-        return hash(repr(self))
+        return self._hash
 
 
-@dataclass
 class Number(Expression):
+    __slots__ = ("value",)
+    __match_args__ = ("value",)
+
     value: int
 
-    def visit(self, visitor: Visitor[T]) -> T:
-        return visitor.visit_number(self)
+    def __init__(self, value: int) -> None:
+        self.value = value
+
+    def __repr__(self) -> str:
+        return f"Number(value={self.value!r})"
+
+    def __eq__(self, other: object) -> bool:
+        return type(other) is Number and self.value == other.value
+
+    __hash__ = None  # type: ignore[assignment]
 
 
-@dataclass
 class TrueV(Expression):
-    def visit(self, visitor: Visitor[T]) -> T:
-        return visitor.visit_true(self)
+    __slots__ = ()
+
+    _instance: ClassVar[Optional[TrueV]] = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = object.__new__(cls)
+        return cls._instance
+
+    def __repr__(self) -> str:
+        return "TrueV()"
 
     def __bool__(self):
         return True
 
 
-@dataclass
 class FalseV(Expression):
-    def visit(self, visitor: Visitor[T]) -> T:
-        return visitor.visit_false(self)
+    __slots__ = ()
+
+    _instance: ClassVar[Optional[FalseV]] = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = object.__new__(cls)
+        return cls._instance
+
+    def __repr__(self) -> str:
+        return "FalseV()"
 
     def __bool__(self):
         return False
 
 
-@dataclass
 class Nil(Expression):
-    def visit(self, visitor: Visitor[T]) -> T:
-        return visitor.visit_nil(self)
+    __slots__ = ()
+
+    _instance: ClassVar[Optional[Nil]] = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = object.__new__(cls)
+        return cls._instance
+
+    def __repr__(self) -> str:
+        return "Nil()"
 
     def __bool__(self):
         return False
 
 
-@dataclass
 class String(Expression):
+    __slots__ = ("value", "_hash", "_readable")
+    __match_args__ = ("value",)
+
     value: str
+    _hash: int
+    # Escaped and quoted form, filled by Pretty the first time it's needed
+    _readable: Optional[str]
+
+    def __init__(self, value: str) -> None:
+        self.value = value
+        self._hash = hash(value)
+        self._readable = None
+
+    def __repr__(self) -> str:
+        return f"String(value={self.value!r})"
 
-    def visit(self, visitor: Visitor[T]) -> T:
-        return visitor.visit_string(self)
+    def __eq__(self, other: object) -> bool:
+        return type(other) is String and self.value == other.value
 
     def __hash__(self):
-        return hash(repr(self))
+        return self._hash
 
 
-@dataclass
+class ListTail(Sequence[ExpressionT]):
+    """
+    Read only view of `backing[offset:]`, it lets `cdr` share the
+    items of the original list instead of copying them.
+    """
+
+    __slots__ = ("backing", "offset")
+
+    backing: Sequence[ExpressionT]
+    offset: int
+
+    def __init__(self, backing: Sequence[ExpressionT], offset: int) -> None:
+        # Never stack views, point to the real storage instead
+        if type(backing) is ListTail:
+            offset += backing.offset
+            backing = backing.backing
+        self.backing = backing
+        self.offset = offset
+
+    def __len__(self) -> int:
+        return max(len(self.backing) - self.offset, 0)
+
+    def __iter__(self) -> Iterator[ExpressionT]:
+        # Index the live items directly, an islice would step over every
+        # skipped one first
+        return map(self.backing.__getitem__, range(self.offset, len(self.backing)))
+
+    @overload
+    def __getitem__(self, index: int) -> ExpressionT:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[ExpressionT]:
+        ...
+
+    def __getitem__(self, index):
+        size = len(self)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(size)
+            if step == 1 and stop == size:
+                return ListTail(self.backing, self.offset + start)
+            return list(self)[index]
+        if index < 0:
+            index += size
+        if index < 0 or index >= size:
+            raise IndexError("ListTail index out of range")
+        return self.backing[self.offset + index]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(x == y for x, y in zip(self, other))
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+def _same_items(a: Sequence[ExpressionT], b: Sequence[ExpressionT]) -> bool:
+    # The reader builds tuples but core builds lists, and a tuple never
+    # equals a list, so compare item by item when they differ
+    if type(a) is type(b):
+        return a == b
+    return len(a) == len(b) and all(x == y for x, y in zip(a, b))
+
+
+@dataclass(slots=True, eq=False)
 class List(Expression):
-    value: list[ExpressionT]
+    value: Sequence[ExpressionT]
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not List:
+            return NotImplemented
+        return _same_items(self.value, other.value)
 
-    def visit(self, visitor: Visitor[T]) -> T:
-        return visitor.visit_list(self)
+    __hash__ = None  # type: ignore[assignment]
 
 
-@dataclass
+@dataclass(slots=True, eq=False)
 class Vector(Expression):
-    value: list[ExpressionT]
+    value: Sequence[ExpressionT]
+    # Set by the reader when every item evaluates to itself, then the
+    # evaluators return the vector as it is instead of rebuilding it
+    constant: bool = field(default=False, repr=False)
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not Vector:
+            return NotImplemented
+        return _same_items(self.value, other.value)
 
-    def visit(self, visitor: Visitor[T]) -> T:
-        return visitor.visit_vector(self)
+    __hash__ = None  # type: ignore[assignment]
 
 
-@dataclass
+@dataclass(slots=True)
 class HashMap(Expression):
     value: dict[Union[String, Keyword], ExpressionT]
+    # Same as Vector.constant
+    constant: bool = field(default=False, repr=False, compare=False)
 
-    def visit(self, visitor: Visitor[T]) -> T:
-        return visitor.visit_hash_map(self)
 
-
-@dataclass
+@dataclass(slots=True)
 class Function(Expression):
     value: Callable[[list[ExpressionT]], ExpressionT]
 
-    def visit(self, visitor: Visitor[T]) -> T:
-        return visitor.visit_function(self)
+    def __call__(self, args: list[ExpressionT]) -> ExpressionT:
+        return self.value(args)
 
 
-@dataclass
+@dataclass(slots=True)
 class FunctionDefinition(Expression):
     params: list[Symbol]
     body: ExpressionT
     env: Environment
     closure: Function
 
-    def visit(self, visitor: Visitor[T]) -> T:
-        return visitor.visit_function_definition(self)
+    def __call__(self, args: list[ExpressionT]) -> ExpressionT:
+        return self.closure.value(args)
 
 
-@dataclass
+@dataclass(slots=True)
 class Atom(Expression):
     value: ExpressionT
 
-    def visit(self, visitor: Visitor[T]) -> T:
-        return visitor.visit_atom(self)
+
+TRUE = TrueV()
+FALSE = FalseV()
+NIL = Nil()
+
+# Node types that always evaluate to themselves
+SELF_EVALUATING = frozenset((Number, String, Keyword, TrueV, FalseV, Nil))
+
+
+_ESCAPE = str.maketrans({"\\": "\\\\", "\n": "\\n", '"': '\\"'})
 
 
 class Pretty(Visitor[str]):
@@ -246,22 +451,57 @@ class Pretty(Visitor[str]):
     def visit_string(self, st: String) -> str:
         if not self.print_readably:
             return f"{st.value}"
-        after_backslash = st.value.replace("\\", "\\\\")
-        after_breaks = after_backslash.replace("\n", "\\n")
-        final = after_breaks.replace('"', '\\"')
-        return f'"{final}"'
+        readable = st._readable
+        if readable is None:
+            readable = f'"{st.value.translate(_ESCAPE)}"'
+            st._readable = readable
+        return readable
 
     def visit_list(self, ls: List) -> str:
-        acc = [e.visit(self) for e in ls.value]
-        return "(" + " ".join(acc) + ")"
+        acc: list[str] = []
+        self._write(ls, acc)
+        return "".join(acc)
 
     def visit_vector(self, v: Vector) -> str:
-        acc = [e.visit(self) for e in v.value]
-        return "[" + " ".join(acc) + "]"
+        acc: list[str] = []
+        self._write(v, acc)
+        return "".join(acc)
 
     def visit_hash_map(self, h: HashMap) -> str:
-        acc = [f"{k.visit(self)} {v.visit(self)}" for k, v in h.value.items()]
-        return "{" + " ".join(acc) + "}"
+        acc: list[str] = []
+        self._write(h, acc)
+        return "".join(acc)
+
+    def _write(self, exp: ExpressionT, acc: list[str]) -> None:
+        # Nested collections append their pieces to a single accumulator,
+        # instead of building and joining a list of strings per level
+        t = type(exp)
+        if t is List:
+            opening, items, closing = "(", exp.value, ")"
+        elif t is Vector:
+            opening, items, closing = "[", exp.value, "]"
+        elif t is HashMap:
+            opening, closing = "{", "}"
+            items = [x for pair in exp.value.items() for x in pair]
+        else:
+            acc.append(self._dispatch[t](self, exp))
+            return None
+        dispatch = self._dispatch
+        append = acc.append
+        append(opening)
+        first = True
+        for e in items:
+            if first:
+                first = False
+            else:
+                append(" ")
+            te = type(e)
+            if te is List or te is Vector or te is HashMap:
+                self._write(e, acc)
+            else:
+                append(dispatch[te](self, e))
+        append(closing)
+        return None
 
     def visit_function(self, fun: Function) -> str:
         return repr(fun)
@@ -271,12 +511,23 @@ class Pretty(Visitor[str]):
 
     def visit_atom(self, a: Atom) -> str:
         if a != a.value:
-            return f"(atom {a.value.visit(self)})"
+            return f"(atom {self.visit(a.value)})"
         return repr(a)
 
 
-@dataclass
+# Pretty keeps no state between calls, so a single instance of each
+# flavour is shared by the whole interpreter
+PRETTY_READABLE = Pretty(True)
+PRETTY_PLAIN = Pretty(False)
+
+
+# Marks a lookup miss, values stored in an environment are never this
+_MISSING = object()
+
+
 class Environment:
+    __slots__ = ("data", "outer")
+
     data: MutableMapping[str, ExpressionT]
     outer: Optional["Environment"]
 
@@ -297,43 +548,75 @@ class Environment:
         if expressions is None:
             raise WrongNumberOfArguments(binds, expressions)
 
-        for i in range(0, len(binds)):
-            if binds[i].symbol == "&":
-                self.set(binds[i + 1], List(expressions[i:]))
-                return None
-            else:
-                self.set(binds[i], expressions[i])
+        names = [b.symbol for b in binds]
+        if "&" not in names:
+            if len(expressions) < len(names):
+                raise WrongNumberOfArguments(binds, expressions)
+            self.data = dict(zip(names, expressions))
+            return None
+
+        variadic = names.index("&")
+        if len(expressions) < variadic:
+            raise WrongNumberOfArguments(binds, expressions)
+        self.data = dict(zip(names[:variadic], expressions))
+        self.data[names[variadic + 1]] = List(expressions[variadic:])
+
+    def __repr__(self) -> str:
+        return f"Environment(data={self.data!r}, outer={self.outer!r})"
 
     def set(self, symbol: Symbol, value: ExpressionT) -> ExpressionT:
         self.data.__setitem__(symbol.symbol, value)
         return value
 
     def find(self, symbol: Symbol) -> Optional[ExpressionT]:
-        try:
-            result = self.data.__getitem__(symbol.symbol)
-        except KeyError:
-            if self.outer is None:
-                return None
-            return self.outer.find(symbol)
-        return result
+        key = symbol.symbol
+        env: Optional[Environment] = self
+        while env is not None:
+            result = env.data.get(key, _MISSING)
+            if result is not _MISSING:
+                return result
+            env = env.outer
+        return None
 
     def get(self, symbol: Symbol) -> ExpressionT:
-        result = self.find(symbol)
-        if result is None:
-            raise SymbolNotFound(symbol, self)
-        return result
+        # Same walk as `find`, inlined since this is the evaluator's
+        # lookup for every symbol
+        key = symbol.symbol
+        env: Optional[Environment] = self
+        while env is not None:
+            result = env.data.get(key, _MISSING)
+            if result is not _MISSING:
+                return result
+            env = env.outer
+        raise SymbolNotFound(symbol, self)
 
 
-@dataclass
 class SymbolNotFound(MalException):
+    __slots__ = ("symbol", "hash_map")
+
     symbol: Symbol
     hash_map: Environment
 
+    def __init__(self, symbol: Symbol, hash_map: Environment) -> None:
+        super().__init__(symbol, hash_map)
+        self.symbol = symbol
+        self.hash_map = hash_map
+
     def __str__(self):
         return f"'{self.symbol.symbol}' not found in the environment: {self.hash_map}"
 
 
-@dataclass
 class WrongNumberOfArguments(MalException):
+    __slots__ = ("symbols", "arguments")
+
     symbols: Optional[list[Symbol]]
     arguments: Optional[list[ExpressionT]]
+
+    def __init__(
+        self,
+        symbols: Optional[list[Symbol]],
+        arguments: Optional[list[ExpressionT]],
+    ) -> None:
+        super().__init__(symbols, arguments)
+        self.symbols = symbols
+        self.arguments = arguments
@@ -1,284 +1,193 @@
-from dataclasses import dataclass
+import re
 from typing import Union
 
-from lark import (Lark, Token, Transformer, UnexpectedInput, UnexpectedToken,
-                  v_args)
-from lark.exceptions import VisitError
-from mal_types import (ExpressionT, FalseV, HashMap, Keyword, List,
-                       MalException, Nil, Number, String, Symbol, TrueV,
+from mal_types import (FALSE, NIL, SELF_EVALUATING, TRUE, ExpressionT, HashMap,
+                       Keyword, List, MalException, Number, String, Symbol,
                        Vector)
 
-grammar = """
-
-SPACES : /\s|,/
-
-%ignore SPACES
-
-COMMENT : /;.*/
-
-%ignore COMMENT
-
-LBRACE : "{"
-RBRACE : "}"
-LPAREN : "("
-RPAREN : ")"
-LBRACKET : "["
-RBRACKET : "]"
-
-SPECIAL: "~@"
-SINGLE_QUOTE : "'"
-BACKTICK : "`"
-TILDE : "~"
-HAT: "^"
-AT : "@"
-
-STRING_COMMON : "\\\"" (/\\\\.|[^"\\\\]/)*  
+# Skips spaces, commas and then captures a single token, this is the
+# usual mal tokenizer regex. A string token without its closing quote is
+# still captured so we can report it as unbalanced.
+TOKEN_RE = re.compile(
+    r"""[\s,]*(~@|[\[\]{}()'`~^@]|"(?:\\.|[^\\"])*"?|;[^\n]*|[^\s\[\]{}('"`,;)]+)"""
+)
 
-STRING : STRING_COMMON "\\\""
+STRING_RE = re.compile(r'"(?:\\.|[^\\"])*"')
 
-UNBALANCED_STRING: STRING_COMMON /$/
+NUMBER_RE = re.compile(r"-?[0-9]+")
 
+ESCAPE_RE = re.compile(r"\\(.)", re.DOTALL)
 
+# Any other escaped character is dropped, as other implementations do
+ESCAPES = {"n": "\n", "\\": "\\", '"': '"'}
 
-NUMBER: /-?[1-9][0-9]*|0+/
+READER_MACROS = {
+    "'": Symbol("quote"),
+    "`": Symbol("quasiquote"),
+    "~": Symbol("unquote"),
+    "~@": Symbol("splice-unquote"),
+    "@": Symbol("deref"),
+}
 
-TRUE : "true"
-FALSE : "false"
-NIL: "nil"
+WITH_META = Symbol("with-meta")
 
-SYMBOL.-1 : /[^\s\[\]{}('"`,;)]+/
-KEYWORD : ":" SYMBOL 
+CLOSING = {"(": ")", "[": "]", "{": "}"}
 
 
-atom : TRUE | FALSE | NIL | NUMBER | KEYWORD | SYMBOL | STRING | UNBALANCED_STRING
-    | quote
-    | quasiquote
-    | unquote
-    | splice_unquote
-    | deref
-    | meta
+class UnbalancedString(MalException):
+    __slots__ = ("token", "line", "column")
 
-quote : SINGLE_QUOTE expression
+    token: str
+    line: int
+    column: int
 
-quasiquote : BACKTICK expression
+    def __init__(self, token: str, line: int, column: int) -> None:
+        super().__init__(token, line, column)
+        self.token = token
+        self.line = line
+        self.column = column
 
-unquote : TILDE expression
 
-splice_unquote : SPECIAL expression
+class ParsingError(MalException):
+    __slots__ = ("msg",)
 
-deref : AT expression
+    msg: str
 
-meta : HAT expression expression
+    def __init__(self, msg: str) -> None:
+        super().__init__(msg)
+        self.msg = msg
 
-list_items : expression+
 
-list : LPAREN list_items RPAREN -> list1
-    | LPAREN RPAREN -> list2
+def is_constant(exp: ExpressionT) -> bool:
+    t = type(exp)
+    if t is Vector or t is HashMap:
+        return exp.constant
+    return t in SELF_EVALUATING
 
-vector : LBRACKET list_items RBRACKET-> vector1
-    | LBRACKET RBRACKET -> vector2
 
-hash_map_item : STRING  expression
-    | KEYWORD expression
+def position(text: str, offset: int) -> tuple[int, int]:
+    line = text.count("\n", 0, offset) + 1
+    column = offset - text.rfind("\n", 0, offset)
+    return (line, column)
 
-hash_map_items : hash_map_item+
 
-hash_map: LBRACE hash_map_items RBRACE -> hash_map1
-    | LBRACE RBRACE -> hash_map2
+def tokenize(text: str) -> list[tuple[str, int]]:
+    tokens = []
+    pos = 0
+    match = TOKEN_RE.match
+    while True:
+        m = match(text, pos)
+        if m is None:
+            return tokens
+        pos = m.end()
+        token = m.group(1)
+        if token[0] != ";":
+            tokens.append((token, m.start(1)))
 
-expression : atom
-    |list 
-    | vector
-    | hash_map
 
-"""
+def _unescape(m: re.Match[str]) -> str:
+    return ESCAPES.get(m.group(1), "")
 
 
-@dataclass
-class UnbalancedString(MalException):
-    token: Token
+def decode_string(token: str) -> String:
+    return String(ESCAPE_RE.sub(_unescape, token[1:-1]))
 
 
-@dataclass
-class WrongBackslash(MalException):
-    inside: Token
+class Reader:
+    text: str
+    tokens: list[tuple[str, int]]
     index: int
 
-
-@dataclass
-class ParsingError(MalException):
-    msg: str
-
-
-@v_args(inline=True)
-class TransformLisP(Transformer):
-    @staticmethod
-    def SYMBOL(token: Token) -> Symbol:
-        return Symbol(token.value)
-
-    @staticmethod
-    def KEYWORD(token: Token) -> Keyword:
-        return Keyword(token.value[1:])
-
-    @staticmethod
-    def NUMBER(token: Token) -> Number:
-        return Number(int(token.value))
-
-    @staticmethod
-    def TRUE(token: Token) -> TrueV:
-        return TrueV()
-
-    @staticmethod
-    def FALSE(token: Token) -> FalseV:
-        return FalseV()
-
-    @staticmethod
-    def NIL(token: Token) -> Nil:
-        return Nil()
-
-    @staticmethod
-    def STRING(token: Token) -> String:
-        text = token.value[1:-1]
-        acc = []
-        i = 0
-        while i < len(text):
-            if text[i] == "\\":
-                if (i + 1) < len(text):
-                    if text[i + 1] == "n":
-                        acc.append("\n")
-                    elif text[i + 1] == "\\":
-                        acc.append("\\")
-                    elif text[i + 1] == '"':
-                        acc.append('"')
-                    i += 2
-                else:
-                    raise WrongBackslash(token, i + 1)
-            else:
-                acc.append(text[i])
-                i += 1
-
-        return String("".join(acc))
-
-    @staticmethod
-    def UNBALANCED_STRING(token: Token) -> String:
-        raise UnbalancedString(token)
-
-    @staticmethod
-    def atom(value: ExpressionT) -> ExpressionT:
-        return value
-
-    @staticmethod
-    def quote(single_quote: Token, exp: ExpressionT) -> ExpressionT:
-        return List([Symbol("quote"), exp])
-
-    @staticmethod
-    def quasiquote(backtick: Token, exp: ExpressionT) -> ExpressionT:
-        return List([Symbol("quasiquote"), exp])
-
-    @staticmethod
-    def unquote(tilde: Token, exp: ExpressionT) -> ExpressionT:
-        return List([Symbol("unquote"), exp])
-
-    @staticmethod
-    def splice_unquote(special: Token, exp: ExpressionT) -> ExpressionT:
-        return List([Symbol("splice-unquote"), exp])
-
-    @staticmethod
-    def deref(at: Token, exp: ExpressionT) -> ExpressionT:
-        return List([Symbol("deref"), exp])
-
-    @staticmethod
-    def meta(hat: Token, exp1: ExpressionT, exp2: ExpressionT) -> ExpressionT:
-        return List([Symbol("with-meta"), exp2, exp1])
-
-    @staticmethod
-    def list_items(*items: ExpressionT) -> list[ExpressionT]:
-        return list(items)
-
-    @staticmethod
-    def list1(lparen: Token, list_items: list[ExpressionT], rparen: Token) -> List:
-        return List(list_items)
-
-    @staticmethod
-    def list2(lparen: Token, rparen: Token) -> ExpressionT:
-        return List([])
-
-    @staticmethod
-    def vector1(
-        lbracket: Token, list_items: list[ExpressionT], rbracket: Token
-    ) -> Vector:
-        return Vector(list_items)
-
-    @staticmethod
-    def vector2(lbracket: Token, rbracket: Token) -> Vector:
-        return Vector([])
-
-    @staticmethod
-    def hash_map_item(
-        key: Union[String, Keyword], exp: ExpressionT
-    ) -> tuple[Union[String, Keyword], ExpressionT]:
-        return (key, exp)
-
-    @staticmethod
-    def hash_map_items(
-        *v: tuple[Union[String, Keyword], ExpressionT]
-    ) -> list[tuple[Union[String, Keyword], ExpressionT]]:
-        return list(v)
-
-    @staticmethod
-    def hash_map1(
-        lbracket: Token,
-        hash_items: list[tuple[Union[String, Keyword], ExpressionT]],
-        rbracket: Token,
-    ) -> HashMap:
-        acc = dict()
-        for key, value in hash_items:
-            print(key, value)
-            acc[key] = value
-        return HashMap(acc)
-
-    @staticmethod
-    def hash_map2(lbracket: Token, rbracket: Token) -> HashMap:
-        return HashMap(dict())
-
-    @staticmethod
-    def expression(exp: ExpressionT) -> ExpressionT:
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.tokens = tokenize(text)
+        self.index = 0
+
+    def next(self) -> tuple[str, int]:
+        if self.index >= len(self.tokens):
+            raise ParsingError("Error! unexpected EOF")
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def read_str(self) -> ExpressionT:
+        exp = self.read_form()
+        # The whole text must be a single form, report whatever follows it
+        if self.index < len(self.tokens):
+            token, offset = self.tokens[self.index]
+            line, column = position(self.text, offset)
+            if token[0] == '"' and STRING_RE.fullmatch(token) is None:
+                raise UnbalancedString(token, line, column)
+            raise ParsingError(f"Error! unexpected '{token}' at {line}:{column}")
         return exp
 
-
-lark = Lark(
-    grammar,
-    debug=True,
-    cache=None,
-    maybe_placeholders=True,
-    keep_all_tokens=True,
-    parser="lalr",
-    lexer="basic",
-    start=["expression"],
-)
-transformer = TransformLisP()
+    def read_form(self) -> ExpressionT:
+        token, offset = self.next()
+        if token in CLOSING:
+            return self.read_sequence(token)
+        macro = READER_MACROS.get(token)
+        if macro is not None:
+            return List((macro, self.read_form()))
+        if token == "^":
+            meta = self.read_form()
+            return List((WITH_META, self.read_form(), meta))
+        if token in (")", "]", "}"):
+            line, column = position(self.text, offset)
+            raise ParsingError(f"Error! unexpected '{token}' at {line}:{column}")
+        return self.read_atom(token, offset)
+
+    def read_sequence(self, opening: str) -> ExpressionT:
+        closing = CLOSING[opening]
+        items = []
+        while True:
+            if self.index >= len(self.tokens):
+                raise ParsingError("Error! unexpected EOF, expected '" + closing + "'")
+            if self.tokens[self.index][0] == closing:
+                self.index += 1
+                break
+            items.append(self.read_form())
+        # The reader never mutates the nodes it builds, tuples are
+        # smaller than lists and can be shared by slices
+        if opening == "(":
+            return List(tuple(items))
+        if opening == "[":
+            return Vector(tuple(items), all(map(is_constant, items)))
+        return self.build_hash_map(items)
+
+    def build_hash_map(self, items: list[ExpressionT]) -> HashMap:
+        if len(items) % 2 != 0:
+            raise ParsingError("Error! odd number of forms in hash map")
+        acc: dict[Union[String, Keyword], ExpressionT] = dict()
+        for i in range(0, len(items), 2):
+            key = items[i]
+            if type(key) is not String and type(key) is not Keyword:
+                raise ParsingError("Error! hash map keys must be strings or keywords")
+            acc[key] = items[i + 1]
+        return HashMap(acc, all(map(is_constant, acc.values())))
+
+    def read_atom(self, token: str, offset: int) -> ExpressionT:
+        if token[0] == '"':
+            if STRING_RE.fullmatch(token) is None:
+                line, column = position(self.text, offset)
+                raise UnbalancedString(token, line, column)
+            return decode_string(token)
+        if NUMBER_RE.fullmatch(token):
+            return Number(int(token))
+        if token == "true":
+            return TRUE
+        if token == "false":
+            return FALSE
+        if token == "nil":
+            return NIL
+        if token[0] == ":" and len(token) > 1:
+            return Keyword(token[1:])
+        return Symbol(token)
 
 
 def parse_str(text: str) -> ExpressionT | str:
-    # We don't use the transformer inside this call to Lark
-    # since we can raise exceptions from the transformer
-    # and the Visitor class of Lark catch them
-    try:
-        result = lark.parse(text)
-    except UnexpectedInput as e:
-        context = e.get_context(text)
-        if isinstance(e, UnexpectedToken):
-            if e.token.type == "$END":
-                return "Error! unexpected EOF\n\n" + context
-            return str(e) + "\n\n" + context
-        return str(e) + "\n\n" + context
     try:
-        transformed = transformer.transform(result)
-        return transformed
-    except VisitError as e:
-        origin = e.orig_exc
-        if isinstance(origin, UnbalancedString):
-            return (
-                f"Error! unbalanced string at {origin.token.line}:{origin.token.column}"
-            )
-        return "Error! while transforming the tree after parsing: \n\n" + repr(origin)
+        return Reader(text).read_str()
+    except UnbalancedString as e:
+        return f"Error! unbalanced string at {e.line}:{e.column}"
+    except ParsingError as e:
+        return e.msg
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from parser import parse_str
 
-from mal_types import ExpressionT, Pretty
+from mal_types import PRETTY_READABLE, ExpressionT
 
 
 def read(text: str) -> ExpressionT | str:
@@ -14,7 +14,7 @@ def eval_mal(exp: ExpressionT) -> ExpressionT:
 
 
 def print_mal(exp: ExpressionT) -> str:
-    return exp.visit(Pretty())
+    return PRETTY_READABLE.visit(exp)
 
 
 def rep(text: str) -> str:
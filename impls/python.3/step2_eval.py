@@ -4,10 +4,9 @@ from dataclasses import dataclass
 from parser import parse_str
 
 from core import get_namespace
-from mal_types import (Atom, Environment, ExpressionT, FalseV, Function,
-                       FunctionDefinition, HashMap, Keyword, List,
-                       MalException, Nil, NonFunctionFormAtFirstListITem,
-                       Number, Pretty, String, Symbol, SymbolNotFound, TrueV,
+from mal_types import (PRETTY_READABLE, Environment, ExpressionT, Function,
+                       HashMap, List, MalException,
+                       NonFunctionFormAtFirstListITem, Symbol, SymbolNotFound,
                        Vector, Visitor)
 
 
@@ -25,65 +24,45 @@ class Evaluator(Visitor[ExpressionT]):
             raise SymbolNotFound(s, self.env)
         return result
 
-    def visit_keyword(self, k: Keyword) -> ExpressionT:
-        return k
+    def visit_self(self, exp: ExpressionT) -> ExpressionT:
+        return exp
 
-    def visit_number(self, n: Number) -> ExpressionT:
-        return n
-
-    def visit_true(self, t: TrueV) -> ExpressionT:
-        return t
-
-    def visit_false(self, f: FalseV) -> ExpressionT:
-        return f
-
-    def visit_nil(self, n: Nil) -> ExpressionT:
-        return n
-
-    def visit_string(self, st: String) -> ExpressionT:
-        return st
+    # Everything but symbols and collections evaluates to itself
+    visit_keyword = visit_number = visit_string = visit_self
+    visit_true = visit_false = visit_nil = visit_self
+    visit_function = visit_function_definition = visit_atom = visit_self
 
     def visit_list(self, ls: List) -> ExpressionT:
-        if ls.value:
-            evaluated = [exp.visit(self) for exp in ls.value]
-            f = evaluated[0]
-            arguments = evaluated[1:]
-            match f:
-                case Function(g):
-                    return g(arguments)
-                case _:
-                    raise NonFunctionFormAtFirstListITem(ls, f, arguments)
-        else:
+        if not ls.value:
             return ls
+        f = self.visit(ls.value[0])
+        if type(f) is not Function:
+            raise NonFunctionFormAtFirstListITem(ls, f, ls.value[1:])
+        dispatch = self._dispatch
+        arguments = [dispatch[type(exp)](self, exp) for exp in ls.value[1:]]
+        return f.value(arguments)
 
     def visit_vector(self, v: Vector) -> ExpressionT:
-        if v.value:
-            return Vector([exp.visit(self) for exp in v.value])
+        if v.value and not v.constant:
+            dispatch = self._dispatch
+            return Vector([dispatch[type(exp)](self, exp) for exp in v.value])
         else:
             return v
 
     def visit_hash_map(self, h: HashMap) -> ExpressionT:
-        if h.value:
-            return HashMap(dict((k, v.visit(self)) for k, v in h.value.items()))
+        if h.value and not h.constant:
+            dispatch = self._dispatch
+            return HashMap({k: dispatch[type(v)](self, v) for k, v in h.value.items()})
         else:
             return h
 
-    def visit_function(self, f: Function) -> ExpressionT:
-        return f
-
-    def visit_function_definition(self, f: FunctionDefinition) -> ExpressionT:
-        return f
-
-    def visit_atom(self, a: Atom) -> ExpressionT:
-        return a
-
 
 def eval_mal(exp: ExpressionT, evaluator: Evaluator) -> ExpressionT:
-    return exp.visit(evaluator)
+    return evaluator.visit(exp)
 
 
 def print_mal(exp: ExpressionT) -> str:
-    return exp.visit(Pretty())
+    return PRETTY_READABLE.visit(exp)
 
 
 def rep(text: str, evaluator: Evaluator) -> str:
@@ -4,10 +4,9 @@ from dataclasses import dataclass
 from parser import parse_str
 
 from core import get_namespace
-from mal_types import (Atom, Environment, ExpressionT, FalseV, Function,
-                       FunctionDefinition, HashMap, Keyword, List,
-                       MalException, Nil, NonFunctionFormAtFirstListITem,
-                       Number, Pretty, String, Symbol, TrueV, Vector, Visitor)
+from mal_types import (PRETTY_READABLE, Environment, ExpressionT, Function,
+                       HashMap, List, MalException,
+                       NonFunctionFormAtFirstListITem, Symbol, Vector, Visitor)
 
 
 def read(text: str) -> ExpressionT | str:
@@ -37,6 +36,11 @@ class ExpectedSymbolInLetDefinition(MalException):
     let_expression: ExpressionT
 
 
+# Symbols are interned, so the special forms are recognized by identity
+_SYM_DEF = Symbol("def!")
+_SYM_LET = Symbol("let*")
+
+
 @dataclass
 class Evaluator(Visitor[ExpressionT]):
     env: Environment
@@ -44,96 +48,89 @@ class Evaluator(Visitor[ExpressionT]):
     def visit_symbol(self, s: Symbol) -> ExpressionT:
         return self.env.get(s)
 
-    def visit_keyword(self, k: Keyword) -> ExpressionT:
-        return k
-
-    def visit_number(self, n: Number) -> ExpressionT:
-        return n
-
-    def visit_true(self, t: TrueV) -> ExpressionT:
-        return t
-
-    def visit_false(self, f: FalseV) -> ExpressionT:
-        return f
+    def visit_self(self, exp: ExpressionT) -> ExpressionT:
+        return exp
 
-    def visit_nil(self, n: Nil) -> ExpressionT:
-        return n
-
-    def visit_string(self, st: String) -> ExpressionT:
-        return st
+    # Everything but symbols and collections evaluates to itself
+    visit_keyword = visit_number = visit_string = visit_self
+    visit_true = visit_false = visit_nil = visit_self
+    visit_function = visit_function_definition = visit_atom = visit_self
 
     def visit_list(self, ls: List) -> ExpressionT:
-        if not ls.value:
-            return ls
-        f = ls.value[0]
-        match f:
-            case Symbol(symbol="def!"):
-                if len(ls.value) != 3:
-                    raise BadNumberOfArguments(f, ls)
-                key = ls.value[1]
-                if not isinstance(key, Symbol):
-                    key = Symbol(repr(key))
-                value = ls.value[2]
-                evaluted_value = value.visit(self)
-                return self.env.set(key, evaluted_value)
-            case Symbol(symbol="let*"):
-                if len(ls.value) != 3:
-                    raise BadNumberOfArguments(f, ls)
-                bindings = ls.value[1]
-                if not isinstance(bindings, List) and not isinstance(bindings, Vector):
-                    raise NotAssignationInLet(ls)
-                if len(bindings.value) % 2 != 0:
-                    raise BadNumberOfAssignations(f, ls)
-
-                new_env = Environment(self.env)
-                new_evaluator = Evaluator(new_env)
-                for i in range(0, len(bindings.value), 2):
-                    symbol = bindings.value[i]
-                    if not isinstance(symbol, Symbol):
-                        raise ExpectedSymbolInLetDefinition(symbol, ls)
-                    new_env.set(
-                        symbol,
-                        bindings.value[i + 1].visit(new_evaluator),
-                    )
-
-                return ls.value[2].visit(new_evaluator)
-            case _:
-                f = f.visit(self)
-                match f:
-                    case Function(g):
-                        arguments = [exp.visit(self) for exp in ls.value[1:]]
-                        return g(arguments)
-                    case _:
-                        raise NonFunctionFormAtFirstListITem(ls, f, ls.value[1:])
+        # The body of a let* is in tail position, instead of visiting it
+        # we point this evaluator to the new environment and loop, so
+        # nested let* forms neither grow the Python stack nor allocate
+        # an evaluator each. The environment is restored on the way out.
+        env = self.env
+        try:
+            while True:
+                if not ls.value:
+                    return ls
+                f = ls.value[0]
+                if f is _SYM_DEF:
+                    if len(ls.value) != 3:
+                        raise BadNumberOfArguments(f, ls)
+                    key = ls.value[1]
+                    if not isinstance(key, Symbol):
+                        key = Symbol(repr(key))
+                    value = ls.value[2]
+                    evaluted_value = self.visit(value)
+                    return self.env.set(key, evaluted_value)
+                if f is _SYM_LET:
+                    if len(ls.value) != 3:
+                        raise BadNumberOfArguments(f, ls)
+                    bindings = ls.value[1]
+                    t = type(bindings)
+                    if t is not List and t is not Vector:
+                        raise NotAssignationInLet(ls)
+                    if len(bindings.value) % 2 != 0:
+                        raise BadNumberOfAssignations(f, ls)
+
+                    new_env = Environment(self.env)
+                    self.env = new_env
+                    set_value = new_env.set
+                    visit = self.visit
+                    it = iter(bindings.value)
+                    for symbol, value in zip(it, it):
+                        if type(symbol) is not Symbol:
+                            raise ExpectedSymbolInLetDefinition(symbol, ls)
+                        set_value(symbol, visit(value))
+
+                    body = ls.value[2]
+                    if type(body) is not List:
+                        return visit(body)
+                    ls = body
+                    continue
+                f = self.visit(f)
+                if type(f) is not Function:
+                    raise NonFunctionFormAtFirstListITem(ls, f, ls.value[1:])
+                dispatch = self._dispatch
+                arguments = [dispatch[type(exp)](self, exp) for exp in ls.value[1:]]
+                return f.value(arguments)
+        finally:
+            self.env = env
 
     def visit_vector(self, v: Vector) -> ExpressionT:
-        if v.value:
-            return Vector([exp.visit(self) for exp in v.value])
+        if v.value and not v.constant:
+            dispatch = self._dispatch
+            return Vector([dispatch[type(exp)](self, exp) for exp in v.value])
         else:
             return v
 
     def visit_hash_map(self, h: HashMap) -> ExpressionT:
-        if h.value:
-            return HashMap(dict((k, v.visit(self)) for k, v in h.value.items()))
+        if h.value and not h.constant:
+            dispatch = self._dispatch
+            return HashMap({k: dispatch[type(v)](self, v) for k, v in h.value.items()})
         else:
             return h
 
-    def visit_function(self, f: Function) -> ExpressionT:
-        return f
-
-    def visit_function_definition(self, f: FunctionDefinition) -> ExpressionT:
-        return f
-
-    def visit_atom(self, a: Atom) -> ExpressionT:
-        return a
-
 
 def eval_mal(exp: ExpressionT, evaluator: Evaluator) -> ExpressionT:
-    return exp.visit(evaluator)
+    return evaluator.visit(exp)
 
 
 def print_mal(exp: ExpressionT) -> str:
-    return exp.visit(Pretty())
+    return PRETTY_READABLE.visit(exp)
 
 
 def rep(text: str, evaluator: Evaluator) -> str:
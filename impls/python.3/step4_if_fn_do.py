@@ -3,30 +3,35 @@ from __future__ import annotations
 import readline
 from dataclasses import dataclass
 from parser import parse_str
+from typing import Callable, cast
 
 from core import get_namespace
-from mal_types import (Atom, Environment, ExpressionT, FalseV, Function,
-                       FunctionDefinition, HashMap, Keyword, List,
-                       MalException, Nil, NonFunctionFormAtFirstListITem,
-                       Number, Pretty, String, Symbol, TrueV, Vector, Visitor)
+from mal_types import (FALSE, NIL, PRETTY_READABLE, Environment, ExpressionT,
+                       Function, HashMap, List, MalException,
+                       NonFunctionFormAtFirstListITem, Symbol, Vector, Visitor)
 
 
 def read(text: str) -> ExpressionT | str:
     return parse_str(text)
 
 
+# Read once when the module is loaded, main evaluates it directly since
+# going through rep would also print the resulting function
+NOT_DEFINITION = cast(ExpressionT, read("(def! not (fn* (a) (if a false true)))"))
+
+
 @dataclass
 class BadNumberOfArguments(MalException):
     head: ExpressionT
     expression: List
 
     def __str__(self):
-        p = Pretty()
+        p = PRETTY_READABLE
         return (
             "Error! bad number of arguments for:\n"
-            + self.head.visit(p)
+            + p.visit(self.head)
             + "\nIn expression: \n"
-            + self.expression.visit(p)
+            + p.visit(self.expression)
         )
 
 
@@ -36,12 +41,12 @@ class BadNumberOfAssignations(MalException):
     expression: List
 
     def __str__(self):
-        p = Pretty()
+        p = PRETTY_READABLE
         return (
             "Error! expected a list or a vector of assignations, got:\n"
-            + self.expression.value[1:].visit(p)
+            + p.visit(List(self.expression.value[1:]))
             + "\nIn let expression: \n"
-            + self.expression.visit(p)
+            + p.visit(self.expression)
         )
 
 
@@ -50,12 +55,12 @@ class NotAssignationInLet(MalException):
     expression: ExpressionT
 
     def __str__(self):
-        p = Pretty()
+        p = PRETTY_READABLE
         return (
             "Error! expected symbol inside let, found:\n"
-            + self.non_symbol.visit(p)
+            + p.visit(self.non_symbol)
             + "\nIn: \n"
-            + self.let_expression.visit(p)
+            + p.visit(self.let_expression)
         )
 
 
@@ -65,12 +70,12 @@ class ExpectedSymbolInLetDefinition(MalException):
     let_expression: ExpressionT
 
     def __str__(self):
-        p = Pretty()
+        p = PRETTY_READABLE
         return (
             "Error! expected symbol inside let, found:\n"
-            + self.non_symbol.visit(p)
+            + p.visit(self.non_symbol)
             + "\nIn: \n"
-            + self.let_expression.visit(p)
+            + p.visit(self.let_expression)
         )
 
 
@@ -79,7 +84,7 @@ class EmptyDoBlock(MalException):
     expression: ExpressionT
 
     def __str__(self):
-        return "Error! empty do block: " + self.expression.visit(Pretty())
+        return "Error! empty do block: " + PRETTY_READABLE.visit(self.expression)
 
 
 @dataclass
@@ -88,12 +93,12 @@ class NonSymbolInBinding(MalException):
     expression: ExpressionT
 
     def __str__(self):
-        p = Pretty()
+        p = PRETTY_READABLE
         return (
             "Error! expected symbol, found:\n"
-            + self.non_symbol.visit(p)
+            + p.visit(self.non_symbol)
             + "\nIn: \n"
-            + self.expression.visit(p)
+            + p.visit(self.expression)
         )
 
 
@@ -104,7 +109,7 @@ class ExpectedListOfBindings(MalException):
     def __str__(self):
         return (
             "Error! expected a non empty list of bindings, got: "
-            + self.expression.visit(Pretty())
+            + PRETTY_READABLE.visit(self.expression)
         )
 
 
@@ -115,137 +120,151 @@ class Evaluator(Visitor[ExpressionT]):
     def visit_symbol(self, s: Symbol) -> ExpressionT:
         return self.env.get(s)
 
-    def visit_keyword(self, k: Keyword) -> ExpressionT:
-        return k
-
-    def visit_number(self, n: Number) -> ExpressionT:
-        return n
-
-    def visit_true(self, t: TrueV) -> ExpressionT:
-        return t
-
-    def visit_false(self, f: FalseV) -> ExpressionT:
-        return f
-
-    def visit_nil(self, n: Nil) -> ExpressionT:
-        return n
+    def visit_self(self, exp: ExpressionT) -> ExpressionT:
+        return exp
 
-    def visit_string(self, st: String) -> ExpressionT:
-        return st
+    # Everything but symbols and collections evaluates to itself
+    visit_keyword = visit_number = visit_string = visit_self
+    visit_true = visit_false = visit_nil = visit_self
+    visit_function = visit_function_definition = visit_atom = visit_self
 
     def visit_list(self, ls: List) -> ExpressionT:
         if not ls.value:
             return ls
         f = ls.value[0]
-        match f:
-            case Symbol(symbol="def!"):
-                if len(ls.value) != 3:
-                    raise BadNumberOfArguments(f, ls)
-                key = ls.value[1]
-                if not isinstance(key, Symbol):
-                    key = Symbol(repr(key))
-                value = ls.value[2]
-                evaluted_value = value.visit(self)
-                return self.env.set(key, evaluted_value)
-            case Symbol(symbol="let*"):
-                if len(ls.value) != 3:
-                    raise BadNumberOfArguments(f, ls)
-                bindings = ls.value[1]
-                if not isinstance(bindings, List) and not isinstance(bindings, Vector):
-                    raise NotAssignationInLet(ls)
-                if len(bindings.value) % 2 != 0:
-                    raise BadNumberOfAssignations(f, ls)
-
-                new_env = Environment(self.env)
-                new_evaluator = Evaluator(new_env)
-                for i in range(0, len(bindings.value), 2):
-                    symbol = bindings.value[i]
-                    if not isinstance(symbol, Symbol):
-                        raise ExpectedSymbolInLetDefinition(symbol, ls)
-                    new_env.set(
-                        symbol,
-                        bindings.value[i + 1].visit(new_evaluator),
-                    )
-
-                return ls.value[2].visit(new_evaluator)
-            case Symbol(symbol="do"):
-                remain = ls.value[1:]
-                if not remain:
-                    raise EmptyDoBlock(ls)
-                acc = remain[0]
-                for exp in remain:
-                    acc = exp.visit(self)
-                return acc
-            case Symbol(symbol="if"):
-                if len(ls.value) == 4:
-                    _, condition, then, _else = ls.value
-                    if condition.visit(self):
-                        return then.visit(self)
-                    return _else.visit(self)
-                elif len(ls.value) == 3:
-                    _, condition, then = ls.value
-                    if condition.visit(self):
-                        return then.visit(self)
-                    return Nil()
-                else:
-                    raise BadNumberOfArguments(ls.value[0], ls)
-
-            case Symbol(symbol="fn*"):
-                if len(ls.value) != 3:
-                    raise BadNumberOfArguments(ls.value[0], ls)
-                bindss = ls.value[1]
-                binds = []
-                if not isinstance(bindss, List) and not isinstance(bindss, Vector):
-                    raise ExpectedListOfBindings(bindss)
-                for elem in bindss.value:
-                    if not isinstance(elem, Symbol):
-                        raise NonSymbolInBinding(elem, ls)
-                    # The copy of the list is only for mypy
-                    binds.append(elem)
-
-                def closure(args: list[ExpressionT]):
-                    new_env = Environment(self.env, binds=binds, expressions=args)
-                    return ls.value[2].visit(Evaluator(new_env))
-
-                return Function(closure)
-
-            case _:
-                f = f.visit(self)
-                match f:
-                    case Function(g):
-                        arguments = [exp.visit(self) for exp in ls.value[1:]]
-                        return g(arguments)
-                    case _:
-                        raise NonFunctionFormAtFirstListITem(ls, f, ls.value[1:])
+        if type(f) is Symbol:
+            special_form = SPECIAL_FORMS.get(f.symbol)
+            if special_form is not None:
+                return special_form(self, ls)
+        f = self.visit(f)
+        if type(f) is not Function:
+            raise NonFunctionFormAtFirstListITem(ls, f, ls.value[1:])
+        dispatch = self._dispatch
+        arguments = [dispatch[type(exp)](self, exp) for exp in ls.value[1:]]
+        return f.value(arguments)
+
+    def eval_def(self, ls: List) -> ExpressionT:
+        f = ls.value[0]
+        if len(ls.value) != 3:
+            raise BadNumberOfArguments(f, ls)
+        key = ls.value[1]
+        if not isinstance(key, Symbol):
+            key = Symbol(repr(key))
+        value = ls.value[2]
+        evaluted_value = self.visit(value)
+        return self.env.set(key, evaluted_value)
+
+    def eval_let(self, ls: List) -> ExpressionT:
+        f = ls.value[0]
+        if len(ls.value) != 3:
+            raise BadNumberOfArguments(f, ls)
+        bindings = ls.value[1]
+        t = type(bindings)
+        if t is not List and t is not Vector:
+            raise NotAssignationInLet(ls)
+        if len(bindings.value) % 2 != 0:
+            raise BadNumberOfAssignations(f, ls)
+
+        # Evaluate the bindings and the body with this same
+        # evaluator pointed to the new environment
+        env = self.env
+        new_env = Environment(env)
+        self.env = new_env
+        try:
+            for i in range(0, len(bindings.value), 2):
+                symbol = bindings.value[i]
+                if not isinstance(symbol, Symbol):
+                    raise ExpectedSymbolInLetDefinition(symbol, ls)
+                new_env.set(
+                    symbol,
+                    self.visit(bindings.value[i + 1]),
+                )
+
+            return self.visit(ls.value[2])
+        finally:
+            self.env = env
+
+    def eval_do(self, ls: List) -> ExpressionT:
+        n = len(ls.value)
+        if n == 1:
+            raise EmptyDoBlock(ls)
+        visit = self.visit
+        for i in range(1, n - 1):
+            visit(ls.value[i])
+        return visit(ls.value[n - 1])
+
+    def eval_if(self, ls: List) -> ExpressionT:
+        if len(ls.value) == 4:
+            _, condition, then, _else = ls.value
+            v = self.visit(condition)
+            if v is not FALSE and v is not NIL:
+                return self.visit(then)
+            return self.visit(_else)
+        elif len(ls.value) == 3:
+            _, condition, then = ls.value
+            v = self.visit(condition)
+            if v is not FALSE and v is not NIL:
+                return self.visit(then)
+            return NIL
+        else:
+            raise BadNumberOfArguments(ls.value[0], ls)
+
+    def eval_fn(self, ls: List) -> ExpressionT:
+        if len(ls.value) != 3:
+            raise BadNumberOfArguments(ls.value[0], ls)
+        bindss = ls.value[1]
+        binds = []
+        t = type(bindss)
+        if t is not List and t is not Vector:
+            raise ExpectedListOfBindings(bindss)
+        for elem in bindss.value:
+            if not isinstance(elem, Symbol):
+                raise NonSymbolInBinding(elem, ls)
+            # The copy of the list is only for mypy
+            binds.append(elem)
+
+        # Capture the current environment, self.env changes while
+        # evaluating let* forms
+        env = self.env
+
+        def closure(args: list[ExpressionT]):
+            new_env = Environment(env, binds=binds, expressions=args)
+            return Evaluator(new_env).visit(ls.value[2])
+
+        return Function(closure)
 
     def visit_vector(self, v: Vector) -> ExpressionT:
-        if v.value:
-            return Vector([exp.visit(self) for exp in v.value])
+        if v.value and not v.constant:
+            dispatch = self._dispatch
+            return Vector([dispatch[type(exp)](self, exp) for exp in v.value])
         else:
             return v
 
     def visit_hash_map(self, h: HashMap) -> ExpressionT:
-        if h.value:
-            return HashMap(dict((k, v.visit(self)) for k, v in h.value.items()))
+        if h.value and not h.constant:
+            dispatch = self._dispatch
+            return HashMap({k: dispatch[type(v)](self, v) for k, v in h.value.items()})
         else:
             return h
 
-    def visit_function(self, f: Function) -> ExpressionT:
-        return f
-
-    def visit_function_definition(self, f: FunctionDefinition) -> ExpressionT:
-        return f
 
-    def visit_atom(self, a: Atom) -> ExpressionT:
-        return a
+# Special forms are looked up by name with a single dict access, instead
+# of matching the head against each of them in turn
+SPECIAL_FORMS: dict[str, Callable[[Evaluator, List], ExpressionT]] = {
+    "def!": Evaluator.eval_def,
+    "let*": Evaluator.eval_let,
+    "do": Evaluator.eval_do,
+    "if": Evaluator.eval_if,
+    "fn*": Evaluator.eval_fn,
+}
 
 
 def eval_mal(exp: ExpressionT, evaluator: Evaluator) -> ExpressionT:
-    return exp.visit(evaluator)
+    return evaluator.visit(exp)
 
 
 def print_mal(exp: ExpressionT) -> str:
-    return exp.visit(Pretty())
+    return PRETTY_READABLE.visit(exp)
 
 
 def rep(text: str, evaluator: Evaluator) -> str:
@@ -266,7 +285,7 @@ def main() -> None:
     default_env.data = default_env_dict
     default_evaluator: Evaluator = Evaluator(default_env)
     # inject the not function, this is required by the tutorial XD
-    rep("(def! not (fn* (a) (if a false true)))", default_evaluator)
+    eval_mal(NOT_DEFINITION, default_evaluator)
     while True:
         try:
             text = input("user> ")
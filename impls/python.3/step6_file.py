@@ -4,30 +4,42 @@ import readline
 import sys
 from dataclasses import dataclass
 from parser import parse_str
+from typing import cast
 
 from core import assert_argument_number, get_namespace
-from mal_types import (Environment, ExpressionT, FalseV, Function,
-                       FunctionDefinition, HashMap, Keyword, List,
-                       MalException, Nil, NonFunctionFormAtFirstListITem,
-                       Number, Pretty, String, Symbol, TrueV, Vector)
+from mal_types import (FALSE, NIL, PRETTY_READABLE, SELF_EVALUATING,
+                       Environment, ExpressionT, Function, FunctionDefinition,
+                       HashMap, List, MalException,
+                       NonFunctionFormAtFirstListITem, String, Symbol, Vector)
 
 
 def read(text: str) -> ExpressionT | str:
     return parse_str(text)
 
 
+# Read once when the module is loaded, main evaluates them directly since
+# going through rep would also print the resulting functions
+NOT_DEFINITION = cast(ExpressionT, read("(def! not (fn* (a) (if a false true)))"))
+LOAD_FILE_DEFINITION = cast(
+    ExpressionT,
+    read(
+        """(def! load-file (fn* (f) (eval (read-string (str "(do " (slurp f) "\nnil)")))))"""
+    ),
+)
+
+
 @dataclass
 class BadNumberOfArguments(MalException):
     head: ExpressionT
     expression: List
 
     def __str__(self):
-        p = Pretty()
+        p = PRETTY_READABLE
         return (
             "Error! bad number of arguments for:\n"
-            + self.head.visit(p)
+            + p.visit(self.head)
             + "\nIn expression: \n"
-            + self.expression.visit(p)
+            + p.visit(self.expression)
         )
 
 
@@ -37,12 +49,12 @@ class BadNumberOfAssignations(MalException):
     expression: List
 
     def __str__(self):
-        p = Pretty()
+        p = PRETTY_READABLE
         return (
             "Error! expected a list or a vector of assignations, got:\n"
-            + self.expression.value[1:].visit(p)
+            + p.visit(List(self.expression.value[1:]))
             + "\nIn let expression: \n"
-            + self.expression.visit(p)
+            + p.visit(self.expression)
         )
 
 
@@ -51,12 +63,12 @@ class NotAssignationInLet(MalException):
     expression: ExpressionT
 
     def __str__(self):
-        p = Pretty()
+        p = PRETTY_READABLE
         return (
             "Error! expected symbol inside let, found:\n"
-            + self.non_symbol.visit(p)
+            + p.visit(self.non_symbol)
             + "\nIn: \n"
-            + self.let_expression.visit(p)
+            + p.visit(self.let_expression)
         )
 
 
@@ -66,12 +78,12 @@ class ExpectedSymbolInLetDefinition(MalException):
     let_expression: ExpressionT
 
     def __str__(self):
-        p = Pretty()
+        p = PRETTY_READABLE
         return (
             "Error! expected symbol inside let, found:\n"
-            + self.non_symbol.visit(p)
+            + p.visit(self.non_symbol)
             + "\nIn: \n"
-            + self.let_expression.visit(p)
+            + p.visit(self.let_expression)
         )
 
 
@@ -80,7 +92,7 @@ class EmptyDoBlock(MalException):
     expression: ExpressionT
 
     def __str__(self):
-        return "Error! empty do block: " + self.expression.visit(Pretty())
+        return "Error! empty do block: " + PRETTY_READABLE.visit(self.expression)
 
 
 @dataclass
@@ -89,12 +101,12 @@ class NonSymbolInBinding(MalException):
     expression: ExpressionT
 
     def __str__(self):
-        p = Pretty()
+        p = PRETTY_READABLE
         return (
             "Error! expected symbol, found:\n"
-            + self.non_symbol.visit(p)
+            + p.visit(self.non_symbol)
             + "\nIn: \n"
-            + self.expression.visit(p)
+            + p.visit(self.expression)
         )
 
 
@@ -105,7 +117,7 @@ class ExpectedListOfBindings(MalException):
     def __str__(self):
         return (
             "Error! expected a non empty list of bindings, got: "
-            + self.expression.visit(Pretty())
+            + PRETTY_READABLE.visit(self.expression)
         )
 
 
@@ -115,139 +127,134 @@ def mal_eval(x: list[ExpressionT], env: Environment) -> ExpressionT:
     return eval_ast(ast, env)
 
 
+# Symbols are interned, so the special forms are recognized by identity
+_SYM_DEF = Symbol("def!")
+_SYM_LET = Symbol("let*")
+_SYM_DO = Symbol("do")
+_SYM_IF = Symbol("if")
+_SYM_FN = Symbol("fn*")
+
+
 def eval_ast(ast: ExpressionT, env: Environment) -> ExpressionT:
     while True:
-        match ast:
-            case Symbol():
-                return env.get(ast)
-            case Keyword() | Number() | TrueV() | FalseV() | Nil() | String():
-                return ast
-            case List():
-                if not ast.value:
-                    return ast
-                f = ast.value[0]
-                match f:
-                    case Symbol(symbol="def!"):
-                        if len(ast.value) != 3:
-                            raise BadNumberOfArguments(f, ast)
-                        key = ast.value[1]
-                        if not isinstance(key, Symbol):
-                            key = Symbol(repr(key))
-                        value = ast.value[2]
-                        evaluted_value = eval_ast(value, env)
-                        return env.set(key, evaluted_value)
-                    case Symbol(symbol="let*"):
-                        if len(ast.value) != 3:
-                            raise BadNumberOfArguments(f, ast)
-                        bindings = ast.value[1]
-                        if not isinstance(bindings, List) and not isinstance(
-                            bindings, Vector
-                        ):
-                            raise NotAssignationInLet(ast)
-                        if len(bindings.value) % 2 != 0:
-                            raise BadNumberOfAssignations(f, ast)
-
-                        env = Environment(env)
-                        for i in range(0, len(bindings.value), 2):
-                            symbol = bindings.value[i]
-                            if not isinstance(symbol, Symbol):
-                                raise ExpectedSymbolInLetDefinition(symbol, ast)
-                            env.set(
-                                symbol,
-                                eval_ast(bindings.value[i + 1], env),
-                            )
-                        ast = ast.value[2]
-                        continue
-                    case Symbol(symbol="do"):
-                        remain = ast.value[1:]
-                        if not remain:
-                            raise EmptyDoBlock(ast)
-                        for exp in remain[:-1]:
-                            eval_ast(exp, env)
-                        ast = remain[-1]
-                        continue
-                    case Symbol(symbol="if"):
-                        if len(ast.value) == 4:
-                            _, condition, then, _else = ast.value
-                            if eval_ast(condition, env):
-                                ast = then
-                            else:
-                                ast = _else
-                            continue
-                        elif len(ast.value) == 3:
-                            _, condition, then = ast.value
-                            if eval_ast(condition, env):
-                                ast = then
-                                continue
-                            return Nil()
-                        else:
-                            raise BadNumberOfArguments(ast.value[0], ast)
-
-                    case Symbol(symbol="fn*"):
-                        if len(ast.value) != 3:
-                            raise BadNumberOfArguments(ast.value[0], ast)
-                        bindss = ast.value[1]
-                        binds = []
-                        if not isinstance(bindss, List) and not isinstance(
-                            bindss, Vector
-                        ):
-                            raise ExpectedListOfBindings(bindss)
-                        for elem in bindss.value:
-                            if not isinstance(elem, Symbol):
-                                raise NonSymbolInBinding(elem, ast)
-                            # The copy of the list is only for mypy
-                            binds.append(elem)
-
-                        current_ast = ast
-
-                        def closure(args: list[ExpressionT]) -> ExpressionT:
-                            new_env = Environment(env, binds=binds, expressions=args)
-                            return eval_ast(current_ast.value[2], new_env)
-
-                        return FunctionDefinition(
-                            binds, ast.value[2], env, Function(closure)
-                        )
-
-                    case _:
-                        f = eval_ast(f, env)
-                        match f:
-                            case Function(g):
-                                arguments = [
-                                    eval_ast(exp, env) for exp in ast.value[1:]
-                                ]
-                                return g(arguments)
-                            case FunctionDefinition(params, body, old_env, closure):
-                                if len(params) != len(ast.value[1:]):
-                                    raise BadNumberOfArguments(f, ast)
-                                arguments = [
-                                    eval_ast(exp, env) for exp in ast.value[1:]
-                                ]
-                                env = Environment(
-                                    old_env, binds=params, expressions=arguments
-                                )
-                                ast = body
-                                continue
-
-                            case _:
-                                raise NonFunctionFormAtFirstListITem(
-                                    ast, f, ast.value[1:]
-                                )
-
-            case Vector(value):
-                if value:
-                    return Vector([eval_ast(exp, env) for exp in value])
+        # Dispatch on the exact type of the node, lists are the only
+        # case that can loop so everything else returns right away
+        t = type(ast)
+        if t is Symbol:
+            return env.get(ast)
+        if t is not List:
+            if t is Vector and ast.value and not ast.constant:
+                return Vector([eval_ast(exp, env) for exp in ast.value])
+            if t is HashMap and ast.value and not ast.constant:
+                return HashMap({k: eval_ast(v, env) for k, v in ast.value.items()})
+            return ast
+        if not ast.value:
+            return ast
+        f = ast.value[0]
+        if f is _SYM_DEF:
+            if len(ast.value) != 3:
+                raise BadNumberOfArguments(f, ast)
+            key = ast.value[1]
+            if not isinstance(key, Symbol):
+                key = Symbol(repr(key))
+            value = ast.value[2]
+            evaluted_value = eval_ast(value, env)
+            return env.set(key, evaluted_value)
+
+        if f is _SYM_LET:
+            if len(ast.value) != 3:
+                raise BadNumberOfArguments(f, ast)
+            bindings = ast.value[1]
+            t = type(bindings)
+            if t is not List and t is not Vector:
+                raise NotAssignationInLet(ast)
+            if len(bindings.value) % 2 != 0:
+                raise BadNumberOfAssignations(f, ast)
+
+            env = Environment(env)
+            data = env.data
+            it = iter(bindings.value)
+            for symbol, value in zip(it, it):
+                if type(symbol) is not Symbol:
+                    raise ExpectedSymbolInLetDefinition(symbol, ast)
+                # Bindings to a symbol or a literal are common enough to
+                # skip the recursive call for them
+                tv = type(value)
+                if tv is Symbol:
+                    value = env.get(value)
+                elif tv in SELF_EVALUATING:
+                    pass
                 else:
-                    return ast
+                    value = eval_ast(value, env)
+                data[symbol.symbol] = value
+            ast = ast.value[2]
+            continue
+
+        if f is _SYM_DO:
+            n = len(ast.value)
+            if n == 1:
+                raise EmptyDoBlock(ast)
+            for i in range(1, n - 1):
+                eval_ast(ast.value[i], env)
+            ast = ast.value[n - 1]
+            continue
 
-            case HashMap(value):
-                if value:
-                    return HashMap(
-                        dict((k, eval_ast(v, env)) for k, v in value.items())
-                    )
+        if f is _SYM_IF:
+            if len(ast.value) == 4:
+                _, condition, then, _else = ast.value
+                v = eval_ast(condition, env)
+                if v is not FALSE and v is not NIL:
+                    ast = then
                 else:
-                    return ast
-            case Function() | FunctionDefinition():
-                return ast
+                    ast = _else
+                continue
+            elif len(ast.value) == 3:
+                _, condition, then = ast.value
+                v = eval_ast(condition, env)
+                if v is not FALSE and v is not NIL:
+                    ast = then
+                    continue
+                return NIL
+            else:
+                raise BadNumberOfArguments(ast.value[0], ast)
+
+        if f is _SYM_FN:
+            if len(ast.value) != 3:
+                raise BadNumberOfArguments(ast.value[0], ast)
+            bindss = ast.value[1]
+            binds = []
+            t = type(bindss)
+            if t is not List and t is not Vector:
+                raise ExpectedListOfBindings(bindss)
+            for elem in bindss.value:
+                if not isinstance(elem, Symbol):
+                    raise NonSymbolInBinding(elem, ast)
+                # The copy of the list is only for mypy
+                binds.append(elem)
+
+            current_ast = ast
+
+            def closure(args: list[ExpressionT]) -> ExpressionT:
+                new_env = Environment(env, binds=binds, expressions=args)
+                return eval_ast(current_ast.value[2], new_env)
+
+            return FunctionDefinition(binds, ast.value[2], env, Function(closure))
+
+        f = eval_ast(f, env)
+        match f:
+            case Function(g):
+                arguments = [eval_ast(exp, env) for exp in ast.value[1:]]
+                return g(arguments)
+            case FunctionDefinition(params, body, old_env, closure):
+                if len(params) != len(ast.value) - 1:
+                    raise BadNumberOfArguments(f, ast)
+                arguments = [eval_ast(exp, env) for exp in ast.value[1:]]
+                env = Environment(old_env, binds=params, expressions=arguments)
+                ast = body
+                continue
+
+            case _:
+                raise NonFunctionFormAtFirstListITem(ast, f, ast.value[1:])
 
 
 def eval_mal(exp: ExpressionT, env: Environment) -> ExpressionT:
@@ -255,7 +262,7 @@ def eval_mal(exp: ExpressionT, env: Environment) -> ExpressionT:
 
 
 def print_mal(exp: ExpressionT) -> str:
-    return exp.visit(Pretty())
+    return PRETTY_READABLE.visit(exp)
 
 
 def rep(text: str, env: Environment) -> str:
@@ -271,17 +278,14 @@ def rep(text: str, env: Environment) -> str:
 
 
 def main() -> None:
-    mal_argv = List([String(x) for x in sys.argv[2:]])
+    mal_argv = List(tuple(String(x) for x in sys.argv[2:]))
     default_env_dict = get_namespace()
     default_env: Environment = Environment(None)
     default_env.data = default_env_dict
     default_env.set(Symbol("*ARGV*"), mal_argv)
     # inject the not function, this is required by the tutorial XD
-    rep("(def! not (fn* (a) (if a false true)))", default_env)
-    rep(
-        """(def! load-file (fn* (f) (eval (read-string (str "(do " (slurp f) "\nnil)")))))""",
-        default_env,
-    )
+    eval_mal(NOT_DEFINITION, default_env)
+    eval_mal(LOAD_FILE_DEFINITION, default_env)
     default_env.set(Symbol("eval"), Function(lambda x: mal_eval(x, default_env)))
     if len(sys.argv) >= 2:
         file_path = sys.argv[1]